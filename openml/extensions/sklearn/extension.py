@@ -1442,12 +1442,15 @@ class SklearnExtension(Extension):
             else:
                 if hasattr(model, "param_distributions"):
                     param_distributions = model.param_distributions
+                elif hasattr(model, "param_grid"):
+                    # e.g., HalvingGridSearchCV
+                    param_distributions = model.param_grid
                 else:
                     raise AttributeError(
                         "Using subclass BaseSearchCV other than "
                         "{GridSearchCV, RandomizedSearchCV}. "
                         "Could not find attribute "
-                        "param_distributions."
+                        "param_distributions or param_grid."
                     )
                 logger.warning(
                     "Warning! Using subclass BaseSearchCV other than "
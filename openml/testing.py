@@ -35,6 +35,7 @@ class TestBase(unittest.TestCase):
         "user": [],
     }  # type: dict
     test_server = "https://test.openml.org/api/v1/xml"
+    production_server = "https://openml.org/api/v1/xml"
     # amueller's read/write key that he will throw away later
     apikey = "610344db6388d9ba34f6db45a3cf71de"
 
@@ -88,7 +89,6 @@ class TestBase(unittest.TestCase):
 
         self.cached = True
         openml.config.apikey = TestBase.apikey
-        self.production_server = "https://openml.org/api/v1/xml"
         openml.config.server = TestBase.test_server
         openml.config.avoid_duplicate_runs = False
         openml.config.cache_directory = self.workdir
@@ -0,0 +1,53 @@
+"""On-disk cache for the responses of read-only API calls made by the unit tests
+
+The cache is installed for the whole test session by the fixture 'api_call_cache' in
+tests/conftest.py.
+"""
+
+# License: BSD 3-Clause
+
+import hashlib
+from typing import Callable, Dict
+import joblib
+
+import openml
+from openml.testing import TestBase
+
+
+def _perform_api_call_with_key(
+    key: str, perform_api_call: Callable, call: str, request_method: str, data: Dict = None
+) -> str:
+    """Performs an API call, ``key`` is the only argument used to look up cached responses."""
+    return perform_api_call(call, request_method, data)
+
+
+def cache_api_calls(perform_api_call: Callable, location: str) -> Callable:
+    """Returns ``perform_api_call`` with responses of read-only production calls cached on disk
+
+    Only GET requests to the production server without file elements are cached. All other
+    calls, in particular all calls to the test server, are passed on to ``perform_api_call``.
+
+    :param perform_api_call: Callable
+        Function with the signature of openml._api_calls._perform_api_call
+    :param location: str
+        Directory of the cache, it is shared between the pytest-xdist workers
+    :return: Callable
+    """
+    memory = joblib.Memory(location=location, verbose=0)
+    cached_api_call = memory.cache(
+        _perform_api_call_with_key, ignore=["perform_api_call", "call", "request_method", "data"]
+    )
+
+    def _perform_api_call(call, request_method, data=None, file_elements=None):
+        if (
+            request_method != "get"
+            or file_elements is not None
+            or openml.config.server != TestBase.production_server
+        ):
+            return perform_api_call(call, request_method, data, file_elements)
+        # a cheap cache key, instead of letting joblib pickle and hash all arguments
+        url = "{}/{}?{}".format(openml.config.server, call, sorted((data or {}).items()))
+        key = hashlib.blake2b(url.encode("utf-8")).hexdigest()
+        return cached_api_call(key, perform_api_call, call, request_method, data)
+
+    return _perform_api_call
@@ -14,6 +14,12 @@ created by the unit tests, run across more than one process.
 This design allows one to comment or remove the conftest.py file to
 disable file deletions, without editing any of the test case files.
 
+Responses of read-only API calls to the production server are cached on disk
+across test sessions, see 'api_call_cache'. The cache is stored in the
+directory given by the environment variable OPENML_TEST_API_CACHE, by default
+'openml-python-test-api-calls/<openml version>' in the temporary directory of
+the system. It is cleared by running pytest with '--clear-api-cache'.
+
 
 Possible Future: class TestBase from openml/testing.py can be included
     under this file and there would not be any requirements to import
@@ -24,11 +30,14 @@ Possible Future: class TestBase from openml/testing.py can be included
 
 import os
 import logging
+import shutil
+import tempfile
 from typing import List
 import pytest
 
 import openml
 from openml.testing import TestBase
+from tests.api_call_cache import cache_api_calls
 
 # creating logger for unit test file deletion status
 logger = logging.getLogger("unit_tests")
@@ -36,6 +45,12 @@ logger.setLevel(logging.DEBUG)
 
 file_list = []
 
+# outside of the repository, because all files created inside of it are deleted after a session
+api_call_cache_directory = os.environ.get(
+    "OPENML_TEST_API_CACHE",
+    os.path.join(tempfile.gettempdir(), "openml-python-test-api-calls", openml.__version__),
+)
+
 
 def worker_id() -> str:
     """ Returns the name of the worker process owning this function call.
@@ -118,7 +133,7 @@ def delete_remote_files(tracker) -> None:
                 logger.warning("Cannot delete ({},{}): {}".format(entity_type, entity, e))
 
 
-def pytest_sessionstart() -> None:
+def pytest_sessionstart(session) -> None:
     """pytest hook that is executed before any unit test starts
 
     This function will be called by each of the worker processes, along with the master process
@@ -129,7 +144,8 @@ def pytest_sessionstart() -> None:
     The order of process spawning is: 'master' -> random ordering of the 'gw{i}' workers.
 
     Since, master is always executed first, it is checked if the current process is 'master' and
-    store a list of strings of paths of all files in the directory (pre-unit test snapshot).
+    * Stores a list of strings of paths of all files in the directory (pre-unit test snapshot)
+    * Clears the cache of API calls if pytest was run with '--clear-api-cache'
 
     :return: None
     """
@@ -138,6 +154,9 @@ def pytest_sessionstart() -> None:
     worker = worker_id()
     if worker == "master":
         file_list = read_file_list()
+        if session.config.getoption("--clear-api-cache"):
+            shutil.rmtree(api_call_cache_directory, ignore_errors=True)
+            logger.info("Cleared the API call cache at {}".format(api_call_cache_directory))
 
 
 def pytest_sessionfinish() -> None:
@@ -181,8 +200,25 @@ def pytest_addoption(parser):
         default=False,
         help="Run the long version of tests which support both short and long scenarios.",
     )
+    parser.addoption(
+        "--clear-api-cache",
+        action="store_true",
+        default=False,
+        help="Clear the on-disk cache of API calls to the production server before the tests.",
+    )
 
 
 @pytest.fixture(scope="class")
 def long_version(request):
     request.cls.long_version = request.config.getoption("--long")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def api_call_cache():
+    """Serves read-only API calls to the production server from an on-disk cache"""
+    perform_api_call = openml._api_calls._perform_api_call
+    openml._api_calls._perform_api_call = cache_api_calls(
+        perform_api_call, api_call_cache_directory
+    )
+    yield
+    openml._api_calls._perform_api_call = perform_api_call
@@ -1294,6 +1294,24 @@ class TestSklearnExtensionFlowFunctions(TestBase):
             with self.assertRaises(PyOpenMLError):
                 self.extension._prevent_optimize_n_jobs(model)
 
+    @unittest.skipIf(
+        LooseVersion(sklearn.__version__) < "0.24",
+        reason="successive halving introduction in 0.24",
+    )
+    def test_paralizable_check_halving_search(self):
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV, HalvingRandomSearchCV
+
+        bagging = sklearn.ensemble.BaggingClassifier(n_jobs=-1)
+        illegal_param_dist = {"base__n_jobs": [-1, 0, 1]}
+        legal_param_dist = {"n_estimators": [2, 3, 4]}
+
+        for search in [HalvingGridSearchCV, HalvingRandomSearchCV]:
+            # does not raise an exception
+            self.extension._prevent_optimize_n_jobs(search(bagging, legal_param_dist))
+            with self.assertRaises(PyOpenMLError):
+                self.extension._prevent_optimize_n_jobs(search(bagging, illegal_param_dist))
+
     def test__get_fn_arguments_with_defaults(self):
         sklearn_version = LooseVersion(sklearn.__version__)
         if sklearn_version < "0.19":
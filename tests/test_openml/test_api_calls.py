@@ -1,7 +1,9 @@
+import os
 import unittest.mock
 
 import openml
 import openml.testing
+from tests.api_call_cache import cache_api_calls
 
 
 class TestConfig(openml.testing.TestBase):
@@ -30,3 +32,25 @@ class TestConfig(openml.testing.TestBase):
             openml._api_calls._send_request("get", "/abc", {})
 
         self.assertEqual(Session_class_mock.return_value.__enter__.return_value.get.call_count, 20)
+
+    def test_cache_api_calls(self):
+        perform_api_call = unittest.mock.Mock(return_value="<oml:response/>")
+        cached_api_call = cache_api_calls(perform_api_call, os.path.join(self.workdir, "cache"))
+
+        openml.config.server = self.production_server
+        for _ in range(2):
+            response = cached_api_call("run/1", "get")
+        self.assertEqual(response, "<oml:response/>")
+        self.assertEqual(perform_api_call.call_count, 1)
+
+        # only read-only calls without file elements are cached
+        for _ in range(2):
+            cached_api_call("run/1", "post", {"run_id": 1})
+            cached_api_call("run/1", "get", file_elements={"description": "<oml:run/>"})
+        self.assertEqual(perform_api_call.call_count, 5)
+
+        # calls to the test server are never cached
+        openml.config.server = self.test_server
+        for _ in range(2):
+            cached_api_call("run/1", "get")
+        self.assertEqual(perform_api_call.call_count, 7)
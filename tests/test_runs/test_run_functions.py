@@ -7,9 +7,12 @@ import random
 import time
 import sys
 import ast
+import shutil
+import tempfile
 import unittest.mock
 
 import numpy as np
+import pytest
 import joblib
 from joblib import parallel_backend
 
@@ -44,6 +47,7 @@ from sklearn.model_selection import RandomizedSearchCV, GridSearchCV, Stratified
 from sklearn.pipeline import Pipeline, make_pipeline
 
 
+@pytest.mark.usefixtures("long_version")
 class TestRun(TestBase):
     _multiprocess_can_split_ = True
     TEST_SERVER_TASK_MISSING_VALS = {
@@ -93,9 +97,50 @@ class TestRun(TestBase):
         warnings.filterwarnings("ignore", category=FutureWarning)
         warnings.filterwarnings("ignore", category=UserWarning)
 
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        # Tasks are downloaded only once per class, together with their datasets. They are kept
+        # in a class-level cache directory, because the working directory of each test is
+        # removed again in tearDown.
+        cls._task_cache_dir = tempfile.mkdtemp()
+        cls._tasks = {}
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls._task_cache_dir, ignore_errors=True)
+        super().tearDownClass()
+
     def setUp(self):
         super().setUp()
         self.extension = openml.extensions.sklearn.SklearnExtension()
+        np.random.seed(1)
+
+    def _get_task(self, task_id):
+        """ Returns the task, it is only downloaded on the first request of the class.
+
+        The cached dataset of the task is copied to the cache directory of the test, so that
+        loading the data of the task does not download or parse the dataset again.
+        """
+        if task_id not in self._tasks:
+            cache_directory = openml.config.cache_directory
+            openml.config.cache_directory = self._task_cache_dir
+            try:
+                task = openml.tasks.get_task(task_id)
+                # loading the data once also stores its pickle in the class-level cache
+                openml.datasets.get_dataset(task.dataset_id).get_data()
+                dataset_cache_dir = os.path.join(
+                    openml.config.get_cache_directory(), "datasets", str(task.dataset_id)
+                )
+            finally:
+                openml.config.cache_directory = cache_directory
+            self._tasks[task_id] = (task, dataset_cache_dir)
+
+        task, dataset_cache_dir = self._tasks[task_id]
+        target = os.path.join(openml.config.get_cache_directory(), "datasets", str(task.dataset_id))
+        if not os.path.exists(target):
+            shutil.copytree(dataset_cache_dir, target)
+        return task
 
     def _wait_for_processed_run(self, run_id, max_waiting_time_seconds):
         # it can take a while for a run to be processed on the OpenML (test)
@@ -245,7 +290,7 @@ class TestRun(TestBase):
             TestBase._mark_entity_for_removal("flow", (flow.flow_id, flow.name))
             TestBase.logger.info("collected from test_run_functions: {}".format(flow.flow_id))
 
-        task = openml.tasks.get_task(task_id)
+        task = self._get_task(task_id)
 
         X, y = task.get_X_and_y()
         self.assertEqual(np.count_nonzero(np.isnan(X)), n_missing_vals)
@@ -370,13 +415,34 @@ class TestRun(TestBase):
                                 self.assertGreater(evaluation, 0)
                             self.assertLess(evaluation, max_time_allowed)
 
-    def test_run_regression_on_classif_task(self):
-        task_id = 115  # diabetes; crossvalidation
+    def _get_mocked_classification_task(self):
+        """ Returns a mocked classification task with a single holdout split of dummy data.
 
+        Can replace a real task in tests which fail before any predictions are made.
+        """
+        X = np.zeros((10, 4))
+        y = np.array([0, 1] * 5)
+
+        def get_X_and_y(dataset_format="array"):
+            if dataset_format == "dataframe":
+                return pd.DataFrame(X), pd.Series(y)
+            return X, y
+
+        task = unittest.mock.Mock(spec=openml.tasks.OpenMLClassificationTask)
+        # run_flow_on_task requires a task id, the id is not used otherwise
+        task.task_id = 115
+        task.dataset_id = 20
+        task.class_labels = ["tested_negative", "tested_positive"]
+        task.get_split_dimensions.return_value = (1, 1, 1)
+        task.get_train_test_split_indices.return_value = (np.arange(8), np.arange(8, 10))
+        task.get_X_and_y.side_effect = get_X_and_y
+        return task
+
+    @unittest.mock.patch("openml.datasets.get_dataset")
+    def test_run_regression_on_classif_task(self, get_dataset_mock):
         clf = LinearRegression()
-        task = openml.tasks.get_task(task_id)
-        # internally dataframe is loaded and targets are categorical
-        # which LinearRegression() cannot handle
+        task = self._get_mocked_classification_task()
+        # the regressor can be fitted, but does not provide the classes of a classifier
         with self.assertRaisesRegex(
             AttributeError, "'LinearRegression' object has no attribute 'classes_'"
         ):
@@ -384,9 +450,9 @@ class TestRun(TestBase):
                 model=clf, task=task, avoid_duplicate_runs=False, dataset_format="array",
             )
 
-    def test_check_erronous_sklearn_flow_fails(self):
-        task_id = 115  # diabetes; crossvalidation
-        task = openml.tasks.get_task(task_id)
+    @unittest.mock.patch("openml.datasets.get_dataset")
+    def test_check_erronous_sklearn_flow_fails(self, get_dataset_mock):
+        task = self._get_mocked_classification_task()
 
         # Invalid parameter values
         clf = LogisticRegression(C="abc", solver="lbfgs")
@@ -395,7 +461,7 @@ class TestRun(TestBase):
             r"Penalty term must be positive; got \(C=u?'abc'\)",  # u? for 2.7/3.4-6 compability
         ):
             openml.runs.run_model_on_task(
-                task=task, model=clf,
+                task=task, model=clf, avoid_duplicate_runs=False,
             )
 
     ###########################################################################
@@ -501,10 +567,16 @@ class TestRun(TestBase):
         return run
 
     def _run_and_upload_classification(
-        self, clf, task_id, n_missing_vals, n_test_obs, flow_expected_rsv, sentinel=None
+        self,
+        clf,
+        task_id,
+        n_missing_vals,
+        n_test_obs,
+        flow_expected_rsv,
+        sentinel=None,
+        num_iterations=5,  # for base search algorithms
     ):
         num_folds = 1  # because of holdout
-        num_iterations = 5  # for base search algorithms
         metric = sklearn.metrics.accuracy_score  # metric class
         metric_name = "predictive_accuracy"  # openml metric name
         task_type = TaskType.SUPERVISED_CLASSIFICATION  # task type
@@ -712,6 +784,7 @@ class TestRun(TestBase):
             BaggingClassifier(base_estimator=SVC()),
             {"base_estimator__C": [0.01, 0.1, 10], "base_estimator__gamma": [0.01, 0.1, 10]},
             cv=3,
+            n_jobs=-1,
         )
         task_id = self.TEST_SERVER_TASK_SIMPLE["task_id"]
         n_missing_vals = self.TEST_SERVER_TASK_SIMPLE["n_missing_vals"]
@@ -725,19 +798,55 @@ class TestRun(TestBase):
         )
         self.assertEqual(len(run.trace.trace_iterations), 9)
 
+    @unittest.skipIf(
+        LooseVersion(sklearn.__version__) < "0.24",
+        reason="successive halving introduction in 0.24",
+    )
+    def test_run_and_upload_halving_gridsearch(self):
+        from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+        from sklearn.model_selection import HalvingGridSearchCV
+
+        gridsearch = HalvingGridSearchCV(
+            BaggingClassifier(base_estimator=SVC(), n_estimators=3, n_jobs=-1),
+            {"base_estimator__C": [0.01, 0.1, 10], "base_estimator__gamma": [0.01, 0.1, 10]},
+            cv=3,
+            factor=3,
+            resource="n_samples",
+            min_resources=30,
+            n_jobs=-1,
+        )
+        task_id = self.TEST_SERVER_TASK_SIMPLE["task_id"]
+        n_missing_vals = self.TEST_SERVER_TASK_SIMPLE["n_missing_vals"]
+        n_test_obs = self.TEST_SERVER_TASK_SIMPLE["n_test_obs"]
+        # With 515 training instances, the 9 candidates are evaluated on 30 instances, the best
+        # 3 of them on 90 instances and the best one on 270 instances
+        num_iterations = 9 + 3 + 1
+        # The random state of the HalvingGridSearchCV is set after the random states of the
+        # SVC and the BaggingClassifier are set
+        run = self._run_and_upload_classification(
+            clf=gridsearch,
+            task_id=task_id,
+            n_missing_vals=n_missing_vals,
+            n_test_obs=n_test_obs,
+            flow_expected_rsv="12172",
+            num_iterations=num_iterations,
+        )
+        self.assertEqual(len(run.trace.trace_iterations), num_iterations)
+
     def test_run_and_upload_randomsearch(self):
         randomsearch = RandomizedSearchCV(
-            RandomForestClassifier(n_estimators=5),
+            RandomForestClassifier(n_estimators=2, n_jobs=-1),
             {
                 "max_depth": [3, None],
-                "max_features": [1, 2, 3, 4],
-                "min_samples_split": [2, 3, 4, 5, 6, 7, 8, 9, 10],
-                "min_samples_leaf": [1, 2, 3, 4, 5, 6, 7, 8, 9, 10],
+                "max_features": [1, 3],
+                "min_samples_split": [2, 5, 10],
+                "min_samples_leaf": [1, 5, 10],
                 "bootstrap": [True, False],
                 "criterion": ["gini", "entropy"],
             },
             cv=StratifiedKFold(n_splits=2, shuffle=True),
             n_iter=5,
+            n_jobs=-1,
         )
         # The random states for the RandomizedSearchCV is set after the
         # random state of the RandomForestClassifier is set, therefore,
@@ -902,7 +1011,7 @@ class TestRun(TestBase):
                 self.assertLessEqual(alt_scores[idx], 1)
 
     def test_local_run_swapped_parameter_order_model(self):
-        clf = DecisionTreeClassifier()
+        clf = DecisionTreeClassifier(random_state=1)
         australian_task = 595  # Australian; crossvalidation
         task = openml.tasks.get_task(australian_task)
 
@@ -924,13 +1033,13 @@ class TestRun(TestBase):
             steps=[
                 ("imputer", SimpleImputer(strategy="most_frequent")),
                 ("encoder", OneHotEncoder(handle_unknown="ignore")),
-                ("estimator", RandomForestClassifier(n_estimators=10)),
+                ("estimator", RandomForestClassifier(n_estimators=10, random_state=1)),
             ]
         )
 
         flow = self.extension.model_to_flow(clf)
         # download task
-        task = openml.tasks.get_task(7)  # kr-vs-kp; crossvalidation
+        task = self._get_task(7)  # kr-vs-kp; crossvalidation
 
         # invoke OpenML run
         run = openml.runs.run_flow_on_task(
@@ -950,12 +1059,12 @@ class TestRun(TestBase):
             steps=[
                 ("imputer", SimpleImputer(strategy="most_frequent")),
                 ("encoder", OneHotEncoder(handle_unknown="ignore")),
-                ("estimator", RandomForestClassifier(n_estimators=10)),
+                ("estimator", RandomForestClassifier(n_estimators=10, random_state=1)),
             ]
         )
 
         # download task
-        task = openml.tasks.get_task(7)  # kr-vs-kp; crossvalidation
+        task = self._get_task(7)  # kr-vs-kp; crossvalidation
 
         # invoke OpenML run
         run = openml.runs.run_model_on_task(
@@ -1056,7 +1165,7 @@ class TestRun(TestBase):
             ),
         ]
 
-        task = openml.tasks.get_task(115)  # diabetes; crossvalidation
+        task = self._get_task(115)  # diabetes; crossvalidation
 
         for clf in clfs:
             try:
@@ -1087,7 +1196,7 @@ class TestRun(TestBase):
     def test_run_with_illegal_flow_id(self):
         # check the case where the user adds an illegal flow id to a
         # non-existing flo
-        task = openml.tasks.get_task(115)  # diabetes; crossvalidation
+        task = self._get_task(115)  # diabetes; crossvalidation
         clf = DecisionTreeClassifier()
         flow = self.extension.model_to_flow(clf)
         flow, _ = self._add_sentinel_to_flow_name(flow, None)
@@ -1103,7 +1212,7 @@ class TestRun(TestBase):
     def test_run_with_illegal_flow_id_after_load(self):
         # Same as `test_run_with_illegal_flow_id`, but test this error is also
         # caught if the run is stored to and loaded from disk first.
-        task = openml.tasks.get_task(115)  # diabetes; crossvalidation
+        task = self._get_task(115)  # diabetes; crossvalidation
         clf = DecisionTreeClassifier()
         flow = self.extension.model_to_flow(clf)
         flow, _ = self._add_sentinel_to_flow_name(flow, None)
@@ -1127,7 +1236,7 @@ class TestRun(TestBase):
     def test_run_with_illegal_flow_id_1(self):
         # Check the case where the user adds an illegal flow id to an existing
         # flow. Comes to a different value error than the previous test
-        task = openml.tasks.get_task(115)  # diabetes; crossvalidation
+        task = self._get_task(115)  # diabetes; crossvalidation
         clf = DecisionTreeClassifier()
         flow_orig = self.extension.model_to_flow(clf)
         try:
@@ -1149,7 +1258,7 @@ class TestRun(TestBase):
     def test_run_with_illegal_flow_id_1_after_load(self):
         # Same as `test_run_with_illegal_flow_id_1`, but test this error is
         # also caught if the run is stored to and loaded from disk first.
-        task = openml.tasks.get_task(115)  # diabetes; crossvalidation
+        task = self._get_task(115)  # diabetes; crossvalidation
         clf = DecisionTreeClassifier()
         flow_orig = self.extension.model_to_flow(clf)
         try:
@@ -1180,21 +1289,95 @@ class TestRun(TestBase):
         reason="OneHotEncoder cannot handle mixed type DataFrame as input",
     )
     def test__run_task_get_arffcontent(self):
-        task = openml.tasks.get_task(7)  # kr-vs-kp; crossvalidation
+        task = self._get_task(7)  # kr-vs-kp; crossvalidation
         num_instances = 3196
-        num_folds = 10
-        num_repeats = 1
+        num_repeats, num_folds, num_samples = task.get_split_dimensions()
+        if not self.long_version:
+            # the checks below hold for any number of folds, only evaluate the first ones
+            num_folds = 3
 
         clf = make_pipeline(
             OneHotEncoder(handle_unknown="ignore"), SGDClassifier(loss="log", random_state=1)
         )
-        res = openml.runs.functions._run_task_get_arffcontent(
-            extension=self.extension,
-            model=clf,
-            task=task,
-            add_local_measures=True,
-            dataset_format="dataframe",
+        with unittest.mock.patch.object(
+            task, "get_split_dimensions", return_value=(num_repeats, num_folds, num_samples)
+        ):
+            res = openml.runs.functions._run_task_get_arffcontent(
+                extension=self.extension,
+                model=clf,
+                task=task,
+                add_local_measures=True,
+                dataset_format="dataframe",
+            )
+        arff_datacontent, trace, fold_evaluations, _ = res
+        # predictions
+        self.assertIsInstance(arff_datacontent, list)
+        # trace. SGD does not produce any
+        self.assertIsInstance(trace, type(None))
+
+        task_type = TaskType.SUPERVISED_CLASSIFICATION
+        self._check_fold_timing_evaluations(
+            fold_evaluations, num_repeats, num_folds, task_type=task_type
+        )
+
+        # one prediction per test instance of each evaluated fold
+        num_test_instances = sum(
+            len(task.get_train_test_split_indices(fold=fold, repeat=repeat)[1])
+            for repeat in range(num_repeats)
+            for fold in range(num_folds)
+        )
+        # check number of rows and columns, a ragged list results in a one-dimensional array
+        arff_data = np.array(arff_datacontent, dtype=object)
+        self.assertEqual(arff_data.shape, (num_test_instances, 8))
+        # check repeat, fold and row id
+        for column, upper_bound in [
+            (0, num_repeats - 1),
+            (1, num_folds - 1),
+            (3, num_instances - 1),
+        ]:
+            values = arff_data[:, column].astype(int)
+            self.assertGreaterEqual(values.min(), 0)
+            self.assertLessEqual(values.max(), upper_bound)
+        # check sample, crossvalidation has a single sample
+        self.assertTrue((arff_data[:, 2] == 0).all())
+        # check confidences
+        np.testing.assert_array_almost_equal(arff_data[:, 4:6].astype(float).sum(axis=1), 1.0)
+        self.assertLessEqual(set(arff_data[:, 6]), {"won", "nowin"})
+        self.assertLessEqual(set(arff_data[:, 7]), {"won", "nowin"})
+
+    @unittest.skipIf(
+        LooseVersion(sklearn.__version__) < "0.20",
+        reason="columntransformer introduction in 0.20.0",
+    )
+    def test__run_task_get_arffcontent_static_cache(self):
+        # task and dataset are loaded from the static cache, nothing needs to be downloaded
+        openml.config.cache_directory = self.static_cache_dir
+        task = openml.tasks.get_task(1882)  # anneal; 10 times 10-fold crossvalidation
+        num_instances = 898
+        num_repeats, num_folds, num_samples = task.get_split_dimensions()
+        if not self.long_version:
+            # the checks below hold for any number of repeats and folds, only evaluate the
+            # first ones
+            num_repeats, num_folds = 3, 3
+
+        from sklearn.compose import ColumnTransformer
+
+        cat_imp = make_pipeline(
+            SimpleImputer(strategy="most_frequent"), OneHotEncoder(handle_unknown="ignore")
         )
+        cont_imp = make_pipeline(CustomImputer(), StandardScaler())
+        ct = ColumnTransformer([("cat", cat_imp, cat), ("cont", cont_imp, cont)])
+        clf = make_pipeline(ct, SGDClassifier(loss="log", random_state=1))
+        with unittest.mock.patch.object(
+            task, "get_split_dimensions", return_value=(num_repeats, num_folds, num_samples)
+        ):
+            res = openml.runs.functions._run_task_get_arffcontent(
+                extension=self.extension,
+                model=clf,
+                task=task,
+                add_local_measures=True,
+                dataset_format="dataframe",
+            )
         arff_datacontent, trace, fold_evaluations, _ = res
         # predictions
         self.assertIsInstance(arff_datacontent, list)
@@ -1206,24 +1389,31 @@ class TestRun(TestBase):
             fold_evaluations, num_repeats, num_folds, task_type=task_type
         )
 
-        # 10 times 10 fold CV of 150 samples
-        self.assertEqual(len(arff_datacontent), num_instances * num_repeats)
-        for arff_line in arff_datacontent:
-            # check number columns
-            self.assertEqual(len(arff_line), 8)
-            # check repeat
-            self.assertGreaterEqual(arff_line[0], 0)
-            self.assertLessEqual(arff_line[0], num_repeats - 1)
-            # check fold
-            self.assertGreaterEqual(arff_line[1], 0)
-            self.assertLessEqual(arff_line[1], num_folds - 1)
-            # check row id
-            self.assertGreaterEqual(arff_line[2], 0)
-            self.assertLessEqual(arff_line[2], num_instances - 1)
-            # check confidences
-            self.assertAlmostEqual(sum(arff_line[4:6]), 1.0)
-            self.assertIn(arff_line[6], ["won", "nowin"])
-            self.assertIn(arff_line[7], ["won", "nowin"])
+        # one prediction per test instance of each evaluated fold
+        num_test_instances = sum(
+            len(task.get_train_test_split_indices(fold=fold, repeat=repeat)[1])
+            for repeat in range(num_repeats)
+            for fold in range(num_folds)
+        )
+        # check number of rows and columns (repeat, fold, sample, row id, 6 confidences,
+        # correct label and prediction), a ragged list results in a one-dimensional array
+        arff_data = np.array(arff_datacontent, dtype=object)
+        self.assertEqual(arff_data.shape, (num_test_instances, 12))
+        # check repeat, fold and row id
+        for column, upper_bound in [
+            (0, num_repeats - 1),
+            (1, num_folds - 1),
+            (3, num_instances - 1),
+        ]:
+            values = arff_data[:, column].astype(int)
+            self.assertGreaterEqual(values.min(), 0)
+            self.assertLessEqual(values.max(), upper_bound)
+        # check sample, crossvalidation has a single sample
+        self.assertTrue((arff_data[:, 2] == 0).all())
+        # check confidences
+        np.testing.assert_array_almost_equal(arff_data[:, 4:10].astype(float).sum(axis=1), 1.0)
+        self.assertLessEqual(set(arff_data[:, 10]), set(task.class_labels))
+        self.assertLessEqual(set(arff_data[:, 11]), set(task.class_labels))
 
     def test__create_trace_from_arff(self):
         with open(self.static_cache_dir + "/misc/trace.arff", "r") as arff_file:
@@ -1409,7 +1599,10 @@ class TestRun(TestBase):
         cont_imp = make_pipeline(CustomImputer(), StandardScaler())
         ct = ColumnTransformer([("cat", cat_imp, cat), ("cont", cont_imp, cont)])
         model = Pipeline(
-            steps=[("preprocess", ct), ("estimator", sklearn.tree.DecisionTreeClassifier())]
+            steps=[
+                ("preprocess", ct),
+                ("estimator", sklearn.tree.DecisionTreeClassifier(random_state=1)),
+            ]
         )  # build a sklearn classifier
 
         data_content, _, _, _ = _run_task_get_arffcontent(
@@ -1451,7 +1644,10 @@ class TestRun(TestBase):
         cont_imp = make_pipeline(CustomImputer(), StandardScaler())
         ct = ColumnTransformer([("cat", cat_imp, cat), ("cont", cont_imp, cont)])
         model = Pipeline(
-            steps=[("preprocess", ct), ("estimator", sklearn.tree.DecisionTreeClassifier())]
+            steps=[
+                ("preprocess", ct),
+                ("estimator", sklearn.tree.DecisionTreeClassifier(random_state=1)),
+            ]
         )  # build a sklearn classifier
 
         data_content, _, _, _ = _run_task_get_arffcontent(
@@ -1573,7 +1769,7 @@ class TestRun(TestBase):
     @unittest.mock.patch("openml.extensions.sklearn.SklearnExtension._prevent_optimize_n_jobs")
     def test__run_task_get_arffcontent_2(self, parallel_mock):
         """ Tests if a run executed in parallel is collated correctly. """
-        task = openml.tasks.get_task(7)  # Supervised Classification on kr-vs-kp
+        task = self._get_task(7)  # Supervised Classification on kr-vs-kp
         x, y = task.get_X_and_y(dataset_format="dataframe")
         num_instances = x.shape[0]
         line_length = 6 + len(task.class_labels)
@@ -1626,7 +1822,7 @@ class TestRun(TestBase):
     @unittest.mock.patch("openml.extensions.sklearn.SklearnExtension._prevent_optimize_n_jobs")
     def test_joblib_backends(self, parallel_mock):
         """ Tests evaluation of a run using various joblib backends and n_jobs. """
-        task = openml.tasks.get_task(7)  # Supervised Classification on kr-vs-kp
+        task = self._get_task(7)  # Supervised Classification on kr-vs-kp
         x, y = task.get_X_and_y(dataset_format="dataframe")
         num_instances = x.shape[0]
         line_length = 6 + len(task.class_labels)
@@ -1641,7 +1837,7 @@ class TestRun(TestBase):
             (1, "sequential", 40),
         ]:
             clf = sklearn.model_selection.RandomizedSearchCV(
-                estimator=sklearn.ensemble.RandomForestClassifier(n_estimators=5),
+                estimator=sklearn.ensemble.RandomForestClassifier(n_estimators=5, random_state=1),
                 param_distributions={
                     "max_depth": [3, None],
                     "max_features": [1, 2, 3, 4],